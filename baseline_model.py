@@ -0,0 +1,87 @@
+"""
+Statistical baseline predictor.
+
+Scores a whole slate at once with NumPy from data the pipeline already has:
+season W/L/T and points for/against per team, the consensus betting lines and a
+home-field term. Used next to the LLM prediction and as its fallback.
+"""
+import numpy as np
+import pandas as pd
+
+# --- MODEL PARAMETERS ---
+HOME_FIELD_POINTS = 1.5   # home-field advantage, in points of margin
+WIN_PCT_POINTS = 6.0      # margin swing between a 1.000 and a .000 team
+LEAGUE_AVG_POINTS = 22.0  # used before a team has played
+MARKET_WEIGHT = 0.6       # weight on market-implied scores when odds are available
+MARGIN_SCALE = 8.0        # logistic scale turning margin into win probability
+
+RATING_DEFAULTS = {'PF_pg': LEAGUE_AVG_POINTS, 'PA_pg': LEAGUE_AVG_POINTS, 'Win_Pct': 0.5}
+
+def _rating(ratings, col):
+    """Rating column as a float array, with unknown teams set to the league default."""
+    return np.nan_to_num(ratings[col].to_numpy(dtype=float), nan=RATING_DEFAULTS[col])
+
+def _numeric_column(df, col):
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+
+def team_ratings(standings_df):
+    """
+    Per-game ratings indexed by Team_Full from a frame with Team_Full, W, L, T, PF, PA.
+    Teams without games, and any rating whose column or value is missing, fall back to
+    RATING_DEFAULTS (league-average scoring, a .500 record). A missing T counts as no ties.
+    """
+    df = standings_df.drop_duplicates(subset=['Team_Full']).set_index('Team_Full')
+    wins, losses, ties, points_for, points_against = (_numeric_column(df, col) for col in ('W', 'L', 'T', 'PF', 'PA'))
+    ties = np.nan_to_num(ties)
+    games = wins + losses + ties
+    # NaN games (W or L unknown) and 0 games both leave every rate NaN, i.e. the default
+    safe_games = np.where(games > 0, games, np.nan)
+    ratings = pd.DataFrame({
+        'PF_pg': points_for / safe_games,
+        'PA_pg': points_against / safe_games,
+        'Win_Pct': (wins + 0.5 * ties) / safe_games,
+    }, index=df.index)
+    return ratings.fillna(RATING_DEFAULTS)
+
+def predict_baseline(games_df, ratings):
+    """
+    Scores every game in games_df (Home Team, Away Team, optional Home_Line_Median/Total_Median).
+    Returns a frame on the same index with the baseline scores, winner, score string and win probability.
+    """
+    home = ratings.reindex(games_df['Home Team'])
+    away = ratings.reindex(games_df['Away Team'])
+    home_pf, home_pa, home_wp = (_rating(home, col) for col in ('PF_pg', 'PA_pg', 'Win_Pct'))
+    away_pf, away_pa, away_wp = (_rating(away, col) for col in ('PF_pg', 'PA_pg', 'Win_Pct'))
+
+    # Stats model: each offense averaged against the opposing defense, plus home field and record
+    edge = (HOME_FIELD_POINTS + WIN_PCT_POINTS * (home_wp - away_wp)) / 2
+    home_pts = (home_pf + away_pa) / 2 + edge
+    away_pts = (away_pf + home_pa) / 2 - edge
+
+    # Market model: home line L and total T imply home = (T - L) / 2, away = (T + L) / 2
+    line = _numeric_column(games_df, 'Home_Line_Median')
+    total = _numeric_column(games_df, 'Total_Median')
+    has_market = ~np.isnan(line) & ~np.isnan(total)
+    home_pts = np.where(has_market, MARKET_WEIGHT * (total - line) / 2 + (1 - MARKET_WEIGHT) * home_pts, home_pts)
+    away_pts = np.where(has_market, MARKET_WEIGHT * (total + line) / 2 + (1 - MARKET_WEIGHT) * away_pts, away_pts)
+
+    home_score = np.rint(home_pts).astype(int)
+    away_score = np.rint(away_pts).astype(int)
+    margin = home_pts - away_pts
+    home_wins = margin >= 0
+    # Rounding can produce a tie; the side with the raw edge keeps the extra point
+    home_score = np.where(home_wins & (home_score == away_score), home_score + 1, home_score)
+    away_score = np.where(~home_wins & (home_score == away_score), away_score + 1, away_score)
+
+    winner = np.where(home_wins, games_df['Home Team'].to_numpy(), games_df['Away Team'].to_numpy())
+    high, low = np.maximum(home_score, away_score), np.minimum(home_score, away_score)
+    return pd.DataFrame({
+        'Baseline_Home_Score': home_score,
+        'Baseline_Away_Score': away_score,
+        'Baseline_Winner': winner,
+        'Baseline_Score': pd.Series(high.astype(str)) + '-' + pd.Series(low.astype(str)),
+        'Baseline_Home_Win_Prob': 1 / (1 + np.exp(-margin / MARGIN_SCALE)),
+        'Baseline_Used_Market': has_market,
+    }).set_index(games_df.index)
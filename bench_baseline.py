@@ -0,0 +1,89 @@
+"""
+Backtest and benchmark for the statistical baseline predictor.
+
+For each completed season, replays every week: team ratings are built only from games
+played before that week, the week's slate is scored with baseline_model, and the picks
+are compared with the final scores. Historical odds aren't available from the API, so
+this measures the stats-only model.
+
+    python3 bench_baseline.py [season ...]
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+import baseline_model
+from pfr_scraper import get_api_data, calculate_nfl_week, CURRENT_YEAR
+
+FINISHED_STATUSES = {'FT', 'AOT'}
+
+def load_results(season):
+    """Completed games for a season with Week, Home/Away Team and final points."""
+    games = []
+    for i in get_api_data("games", {"league": "1", "season": str(season)}):
+        game_info = i.get('game', {})
+        if game_info.get('status', {}).get('short') not in FINISHED_STATUSES:
+            continue
+        scores = i.get('scores', {})
+        games.append({
+            'GameID': game_info.get('id'),
+            'Date': game_info.get('date', {}).get('date'),
+            'Home Team': i.get('teams', {}).get('home', {}).get('name'),
+            'Away Team': i.get('teams', {}).get('away', {}).get('name'),
+            'Home_Points': scores.get('home', {}).get('total'),
+            'Away_Points': scores.get('away', {}).get('total'),
+        })
+    results = pd.DataFrame(games)
+    if results.empty:
+        return results
+    results = calculate_nfl_week(results)
+    results = results[results['Week'] > 0].copy()
+    results[['Home_Points', 'Away_Points']] = results[['Home_Points', 'Away_Points']].apply(pd.to_numeric, errors='coerce')
+    return results.dropna(subset=['Home_Points', 'Away_Points']).reset_index(drop=True)
+
+def standings_before(results, week):
+    """W/L/T/PF/PA per team from games played before the given week, in the standings-tab layout."""
+    played = results[results['Week'] < week]
+    home = pd.DataFrame({'Team_Full': played['Home Team'], 'PF': played['Home_Points'], 'PA': played['Away_Points']})
+    away = pd.DataFrame({'Team_Full': played['Away Team'], 'PF': played['Away_Points'], 'PA': played['Home_Points']})
+    long = pd.concat([home, away], ignore_index=True)
+    long['W'] = (long['PF'] > long['PA']).astype(int)
+    long['L'] = (long['PF'] < long['PA']).astype(int)
+    long['T'] = (long['PF'] == long['PA']).astype(int)
+    return long.groupby('Team_Full', as_index=False)[['W', 'L', 'T', 'PF', 'PA']].sum()
+
+def backtest(season):
+    results = load_results(season)
+    if results.empty:
+        print(f"  {season}: no completed games returned.")
+        return
+
+    predictions, slate_seconds = [], []
+    for week in sorted(results['Week'].unique()):
+        slate = results[results['Week'] == week]
+        ratings = baseline_model.team_ratings(standings_before(results, week))
+        start = time.perf_counter()
+        predictions.append(baseline_model.predict_baseline(slate, ratings))
+        slate_seconds.append(time.perf_counter() - start)
+
+    predicted = pd.concat(predictions)
+    actual_margin = (results['Home_Points'] - results['Away_Points']).to_numpy()
+    predicted_margin = (predicted['Baseline_Home_Score'] - predicted['Baseline_Away_Score']).reindex(results.index).to_numpy()
+    decided = actual_margin != 0
+    home_won = actual_margin > 0
+
+    accuracy = np.mean((predicted_margin[decided] > 0) == home_won[decided])
+    home_accuracy = np.mean(home_won[decided])
+    margin_mae = np.mean(np.abs(predicted_margin - actual_margin))
+    print(f"  {season}: {len(results)} games | winner accuracy {accuracy:.1%} "
+          f"(always-home {home_accuracy:.1%}) | margin MAE {margin_mae:.1f} pts | "
+          f"median slate {np.median(slate_seconds) * 1000:.2f} ms")
+
+def main():
+    seasons = [int(s) for s in sys.argv[1:]] or [CURRENT_YEAR - 1, CURRENT_YEAR - 2]
+    print("--- Baseline backtest ---")
+    for season in seasons:
+        backtest(season)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Startup benchmark for run_predictions.
+
+Imports the module in a fresh interpreter several times and reports the wall-clock
+import time, plus the slowest individual imports from `python -X importtime`.
+
+    python3 bench_startup.py [runs]
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+MODULE = "run_predictions"
+TOP_IMPORTS = 10
+
+def time_import(module):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+    return time.perf_counter() - start
+
+def slowest_imports(module, top_n):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:top_n]
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    time_import(MODULE)  # warm the filesystem cache
+    timings = [time_import(MODULE) for _ in range(runs)]
+    print(f"import {MODULE}: median {statistics.median(timings) * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms over {runs} runs")
+
+    print("\nSlowest imports (cumulative):")
+    for cumulative_us, name in slowest_imports(MODULE, TOP_IMPORTS):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
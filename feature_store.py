@@ -0,0 +1,283 @@
+"""
+Local rolling-window feature store for players and teams.
+
+Per-game statistics are ingested from API-Sports incrementally: only completed games that
+haven't been stored yet are fetched. Each entity keeps its last WINDOW games in a NumPy
+ring buffer, and rolling sums (last 3 / last 5) and season totals are updated as each game
+is appended. A lookup is a dict access plus a few array reads, with nothing recomputed.
+
+Players are keyed by team plus normalized name, so two players sharing a name on
+different teams never mix. API team names go through team_key_fn (the sheet's team_match
+mapping in the pipeline) so lookups by the pipeline's full team names line up. The store is saved per season under FEATURE_STORE_DIR as one
+.npz file plus a small JSON file listing the ingested games.
+"""
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURATION ---
+FEATURE_STORE_DIR = os.getenv('FEATURE_STORE_DIR', 'feature_store')
+WINDOW = 5
+SHORT_WINDOW = 3
+FINISHED_STATUSES = {'FT', 'AOT'}
+MAX_NEW_GAMES_PER_RUN = 40  # caps API calls on a cold cache; the backlog is caught up over later runs
+SAVE_EVERY = 10             # games ingested between saves, so a failed run keeps its progress
+API_DELAY_SECONDS = 1.5     # pause between per-game statistics calls, same as the scraper
+STORE_VERSION = 3  # bump when the key layout changes; older stores are rebuilt from scratch
+
+PLAYER_STATS = ['Pass_Yds', 'Pass_TD', 'Int', 'Rush_Att', 'Rush_Yds', 'Rush_TD', 'Rec', 'Rec_Yds', 'Rec_TD']
+TEAM_STATS = ['PF', 'PA', 'Pass_Yds', 'Rush_Yds']
+
+# (group name, API statistic name) -> feature column
+PLAYER_STAT_MAP = {
+    ('Passing', 'yards'): 'Pass_Yds',
+    ('Passing', 'passing touch downs'): 'Pass_TD',
+    ('Passing', 'interceptions'): 'Int',
+    ('Rushing', 'total rushes'): 'Rush_Att',
+    ('Rushing', 'yards'): 'Rush_Yds',
+    ('Rushing', 'rushing touch downs'): 'Rush_TD',
+    ('Receiving', 'total receptions'): 'Rec',
+    ('Receiving', 'yards'): 'Rec_Yds',
+    ('Receiving', 'receiving touch downs'): 'Rec_TD',
+}
+
+def _to_float(value):
+    try:
+        return float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return 0.0
+
+ARRAY_NAMES = ['recent', 'games', 'totals', 'last_short', 'last_window']
+
+def player_key(team_name, player_key_name):
+    """Store key for a player: team plus normalized name."""
+    return f"{team_name}|{player_key_name}"
+
+class RollingTable:
+    """
+    Array-backed rolling aggregates for a set of entities (players or teams).
+    Row i of every array belongs to keys[i]; index maps key -> row for O(1) lookups.
+    """
+    def __init__(self, stats, keys=None, arrays=None):
+        self.stats = list(stats)
+        self.keys = list(keys) if keys is not None else []
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        n, k = len(self.keys), len(self.stats)
+        arrays = arrays or {}
+        self.recent = arrays.get('recent', np.zeros((n, WINDOW, k), dtype=np.float32))  # ring buffer of the last WINDOW games
+        self.games = arrays.get('games', np.zeros(n, dtype=np.int32))
+        self.totals = arrays.get('totals', np.zeros((n, k), dtype=np.float32))
+        self.last_short = arrays.get('last_short', np.zeros((n, k), dtype=np.float32))
+        self.last_window = arrays.get('last_window', np.zeros((n, k), dtype=np.float32))
+
+    def _row(self, key):
+        row = self.index.get(key)
+        if row is None:
+            row = len(self.keys)
+            self.keys.append(key)
+            self.index[key] = row
+            # Grow by doubling so appending new entities stays amortized O(1)
+            if row >= len(self.games):
+                capacity = max(2 * len(self.games), 64)
+                for name in ARRAY_NAMES:
+                    old = getattr(self, name)
+                    grown = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+                    grown[:len(old)] = old
+                    setattr(self, name, grown)
+        return row
+
+    def append(self, key, values):
+        """Adds one game's stat vector (ordered like self.stats) for key, updating every rolling sum."""
+        row = self._row(key)
+        values = np.asarray(values, dtype=np.float32)
+        count = self.games[row]
+        slot = count % WINDOW
+        # Drop the game leaving each window before overwriting its slot
+        if count >= SHORT_WINDOW:
+            self.last_short[row] -= self.recent[row, (count - SHORT_WINDOW) % WINDOW]
+        if count >= WINDOW:
+            self.last_window[row] -= self.recent[row, slot]
+        self.recent[row, slot] = values
+        self.last_short[row] += values
+        self.last_window[row] += values
+        self.totals[row] += values
+        self.games[row] = count + 1
+
+    def features(self, key):
+        """Per-game rates over the last 3, last 5 and all games for key, or None if it has never played."""
+        row = self.index.get(key)
+        if row is None or not self.games[row]:
+            return None
+        count = int(self.games[row])
+        short_n, window_n = min(count, SHORT_WINDOW), min(count, WINDOW)
+        features = {'GP': count}
+        for i, stat in enumerate(self.stats):
+            features[f"{stat}_L{SHORT_WINDOW}"] = round(float(self.last_short[row, i]) / short_n, 1)
+            features[f"{stat}_L{WINDOW}"] = round(float(self.last_window[row, i]) / window_n, 1)
+            features[f"{stat}_pg"] = round(float(self.totals[row, i]) / count, 1)
+        return features
+
+    def to_arrays(self, prefix):
+        n = len(self.keys)
+        arrays = {f"{prefix}_{name}": getattr(self, name)[:n] for name in ARRAY_NAMES}
+        arrays[f"{prefix}_keys"] = np.array(self.keys, dtype=str)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, stats, data, prefix):
+        return cls(stats, data[f"{prefix}_keys"].tolist(), {name: data[f"{prefix}_{name}"] for name in ARRAY_NAMES})
+
+class FeatureStore:
+    """Player and team rolling tables for one season, plus the set of games already ingested."""
+    def __init__(self, season, key_fn=None, team_key_fn=None):
+        self.season = season
+        self.key_fn = key_fn or (lambda name: name)
+        self.team_key_fn = team_key_fn or (lambda name: name)
+        self.players = RollingTable(PLAYER_STATS)
+        self.teams = RollingTable(TEAM_STATS)
+        self.ingested_game_ids = set()
+        self.games_remaining = 0  # completed games left for later runs by MAX_NEW_GAMES_PER_RUN
+
+    @property
+    def _base_path(self):
+        return os.path.join(FEATURE_STORE_DIR, str(self.season))
+
+    @classmethod
+    def load(cls, season, key_fn=None, team_key_fn=None):
+        store = cls(season, key_fn, team_key_fn)
+        if os.path.exists(store._base_path + ".npz") and os.path.exists(store._base_path + ".json"):
+            with open(store._base_path + ".json") as f:
+                meta = json.load(f)
+            if meta.get('version') != STORE_VERSION:
+                print(f"  -> Feature store for {season} uses an older layout; rebuilding it.")
+                return store
+            with np.load(store._base_path + ".npz") as data:
+                store.players = RollingTable.from_arrays(PLAYER_STATS, data, 'player')
+                store.teams = RollingTable.from_arrays(TEAM_STATS, data, 'team')
+            store.ingested_game_ids = set(meta['ingested_game_ids'])
+        return store
+
+    def save(self):
+        os.makedirs(FEATURE_STORE_DIR, exist_ok=True)
+        np.savez_compressed(self._base_path + ".npz", **self.players.to_arrays('player'), **self.teams.to_arrays('team'))
+        with open(self._base_path + ".json", "w") as f:
+            json.dump({'version': STORE_VERSION, 'ingested_game_ids': sorted(self.ingested_game_ids)}, f)
+
+    def ingest_game(self, game, player_stats_data):
+        """Appends one completed game: a row per player who recorded stats, and a row per team."""
+        teams = game.get('teams', {})
+        scores = game.get('scores', {})
+        home_name = self.team_key_fn(teams.get('home', {}).get('name'))
+        away_name = self.team_key_fn(teams.get('away', {}).get('name'))
+        team_rows = {
+            home_name: dict.fromkeys(TEAM_STATS, 0.0),
+            away_name: dict.fromkeys(TEAM_STATS, 0.0),
+        }
+        team_rows[home_name].update(PF=_to_float(scores.get('home', {}).get('total')), PA=_to_float(scores.get('away', {}).get('total')))
+        team_rows[away_name].update(PF=_to_float(scores.get('away', {}).get('total')), PA=_to_float(scores.get('home', {}).get('total')))
+
+        player_rows = {}
+        for team_data in player_stats_data:
+            team_name = self.team_key_fn(team_data.get('team', {}).get('name'))
+            for group in team_data.get('groups', []):
+                group_name = group.get('name')
+                for entry in group.get('players', []):
+                    name = entry.get('player', {}).get('name')
+                    if not name: continue
+                    key = player_key(team_name, self.key_fn(name))
+                    for stat in entry.get('statistics', []):
+                        column = PLAYER_STAT_MAP.get((group_name, stat.get('name')))
+                        if not column: continue
+                        # Only players with a tracked stat get a row; defenders, kickers and punters are skipped
+                        row = player_rows.setdefault(key, dict.fromkeys(PLAYER_STATS, 0.0))
+                        row[column] = _to_float(stat.get('value'))
+                        if column in TEAM_STATS and team_name in team_rows:
+                            team_rows[team_name][column] += row[column]
+
+        for key, row in player_rows.items():
+            self.players.append(key, [row[stat] for stat in PLAYER_STATS])
+        for team_name, row in team_rows.items():
+            if team_name:
+                self.teams.append(team_name, [row[stat] for stat in TEAM_STATS])
+        self.ingested_game_ids.add(game.get('game', {}).get('id'))
+
+    def update(self, get_api_data):
+        """
+        Fetches and appends up to MAX_NEW_GAMES_PER_RUN completed games not yet in the store,
+        saving every SAVE_EVERY games and again on the way out. Returns the count; games left
+        for later runs are recorded in games_remaining.
+        """
+        games = get_api_data("games", {"league": "1", "season": str(self.season)})
+        new_games = [
+            g for g in games
+            if g.get('game', {}).get('status', {}).get('short') in FINISHED_STATUSES
+            and g.get('game', {}).get('id') not in self.ingested_game_ids
+        ]
+        # Rolling windows depend on order, so append oldest first
+        new_games.sort(key=lambda g: (g.get('game', {}).get('date', {}).get('date') or '', g.get('game', {}).get('date', {}).get('time') or ''))
+        self.games_remaining = max(len(new_games) - MAX_NEW_GAMES_PER_RUN, 0)
+        if self.games_remaining:
+            print(f"  -> {len(new_games)} games to ingest; fetching the oldest {MAX_NEW_GAMES_PER_RUN} this run.")
+            new_games = new_games[:MAX_NEW_GAMES_PER_RUN]
+        added = 0
+        try:
+            for i, game in enumerate(new_games):
+                if i:
+                    time.sleep(API_DELAY_SECONDS)
+                game_id = game['game']['id']
+                player_stats_data = get_api_data("games/statistics/players", {"id": game_id})
+                if not player_stats_data:
+                    print(f"  -> No player statistics for game {game_id} yet; will retry next run.")
+                    continue
+                self.ingest_game(game, player_stats_data)
+                added += 1
+                if added % SAVE_EVERY == 0:
+                    self.save()
+        finally:
+            if added % SAVE_EVERY:
+                self.save()
+        return added
+
+    @property
+    def backfilling(self):
+        """True while older games are still being caught up, i.e. the windows don't reach the latest games yet."""
+        return self.games_remaining > 0
+
+    def player_features(self, name, team_name):
+        return self.players.features(player_key(team_name, self.key_fn(name)))
+
+    def team_features(self, team_name):
+        return self.teams.features(team_name)
+
+    def recent_form(self, names, team_name=None, table='players'):
+        """
+        Feature rows for the given players of team_name (or the given teams, with table='teams')
+        as a DataFrame, dropping stats that are all zero.
+        """
+        rows = []
+        for name in sorted(names):
+            features = self.player_features(name, team_name) if table == 'players' else self.team_features(name)
+            if features:
+                rows.append({'Name': name, **features})
+        df = pd.DataFrame(rows)
+        if df.empty:
+            return df
+        numeric = df.drop(columns=['Name', 'GP'])
+        return df[['Name', 'GP'] + [c for c in numeric.columns if numeric[c].any()]]
+
+def update_store(season, get_api_data, key_fn=None, team_key_fn=None, store=None):
+    """
+    Ingests any newly completed games into store (loaded from disk if not given) and returns it;
+    store.update saves as it goes.
+    Long-running callers pass their in-memory store back in to skip reloading it.
+    """
+    if store is None:
+        store = FeatureStore.load(season, key_fn, team_key_fn)
+    print(f"\n--- Updating feature store for {season} ({len(store.ingested_game_ids)} games stored) ---")
+    added = store.update(get_api_data)
+    print(f"  -> Ingested {added} new game(s); tracking {len(store.players.keys)} players and {len(store.teams.keys)} teams.")
+    if store.backfilling:
+        print(f"  -> {store.games_remaining} completed game(s) left to backfill; recent form is withheld until caught up.")
+    return store
@@ -0,0 +1,86 @@
+"""
+Shared HTTP client for every outbound call (API-Sports, NWS, FootballGuys).
+
+One client per process reuses keep-alive connections, asks for gzip, and applies a
+default timeout so no call can hang forever. The default requests backend keeps a
+separate pool per host (POOL_CONNECTIONS hosts, POOL_MAXSIZE connections each).
+
+HTTP/2 is optional: set NFL_HTTP2=1 with `httpx[http2]` installed. httpx has no per-host
+limit, so it gets one shared pool sized to the same total. Without httpx (or h2) the
+client falls back to the pooled requests.Session.
+
+Tests can swap the transport with configure(transport=...): a requests HTTPAdapter
+for the default client, or an httpx transport (e.g. httpx.MockTransport) for HTTP/2.
+"""
+import os
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- CONFIGURATION ---
+DEFAULT_TIMEOUT = 30
+POOL_CONNECTIONS = 10  # number of hosts to keep pools for (requests backend)
+POOL_MAXSIZE = 10      # connections kept alive per host (requests backend)
+USE_HTTP2 = os.getenv('NFL_HTTP2', '').lower() in ('1', 'true', 'yes')
+DEFAULT_HEADERS = {"Accept-Encoding": "gzip, deflate"}
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Catch this in callers instead of requests.exceptions.RequestException so both backends are covered
+REQUEST_ERRORS = (requests.exceptions.RequestException,) + ((httpx.HTTPError,) if httpx else ())
+
+_client = None
+_settings = {'transport': None, 'http2': USE_HTTP2, 'timeout': DEFAULT_TIMEOUT}
+
+def _build_client():
+    if _settings['http2'] and httpx is None:
+        print("  -> HTTP/2 requested but httpx is not installed; falling back to HTTP/1.1.")
+    elif _settings['http2']:
+        # httpx limits are pool-wide, not per host, so size the shared pool to the requests backend's total
+        pool_size = POOL_CONNECTIONS * POOL_MAXSIZE
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        try:
+            return httpx.Client(http2=True, headers=DEFAULT_HEADERS, limits=limits,
+                                timeout=_settings['timeout'], transport=_settings['transport'])
+        except ImportError:
+            print("  -> HTTP/2 requested but the 'h2' package is missing; falling back to HTTP/1.1.")
+
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    adapter = _settings['transport'] or HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+def get(url, headers=None, params=None, timeout=None):
+    """GET through the shared pooled client, using DEFAULT_TIMEOUT unless one is given."""
+    return get_client().get(url, headers=headers, params=params, timeout=timeout or _settings['timeout'])
+
+def configure(transport=None, http2=None, timeout=None, reset_transport=False):
+    """
+    Replaces the shared client, e.g. to plug in a test transport or toggle HTTP/2.
+    Settings not passed are kept; reset_transport=True drops an installed transport.
+    """
+    close()
+    if reset_transport:
+        _settings['transport'] = None
+    if transport is not None:
+        _settings['transport'] = transport
+    if http2 is not None:
+        _settings['http2'] = http2
+    if timeout is not None:
+        _settings['timeout'] = timeout
+
+def close():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
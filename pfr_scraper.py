@@ -2,16 +2,18 @@ import os
 import json
 import re
 import time
+import numpy as np
 import pandas as pd
 import gspread
-import requests 
+import http_client
+import publisher
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
+from pipeline_config import load_publish_targets
 
 load_dotenv()
 
 # --- CONFIGURATION ---
-SPREADSHEET_KEY = "1NPpxs5wMkDZ8LJhe5_AC3FXR_shMHxQsETdaiAJifio"
 CURRENT_YEAR = 2025
 PREVIOUS_YEAR = CURRENT_YEAR - 1
 API_KEY = os.getenv('AMERICAN_FOOTBALL_API_KEY')
@@ -46,13 +48,137 @@ def get_api_data(endpoint, params):
     url = f"https://{API_HOST}/{endpoint}"
     headers = {"x-rapidapi-key": API_KEY, "x-rapidapi-host": API_HOST}
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = http_client.get(url, headers=headers, params=params)
         response.raise_for_status()
         return response.json().get('response', [])
-    except requests.exceptions.RequestException as e:
+    except http_client.REQUEST_ERRORS as e:
         print(f"  -> API request failed for endpoint '{endpoint}': {e}")
         return []
 
+# --- STREAMING PLAYER STAT BUFFERS ---
+PLAYER_STAT_GROUPS = ('Passing', 'Rushing', 'Receiving')
+
+def new_stat_buffer():
+    """Columnar row buffer: one list per column, a live flag per row, and a Player -> latest row index."""
+    return {'columns': {'Player': [], 'Tm': []}, 'index': {}, 'live': [], 'size': 0}
+
+def append_stat_row(buffer, row):
+    """
+    Appends a row to the buffer. A repeated Player marks the earlier row dead, so the latest
+    row wins and keeps its own position, like drop_duplicates(keep='last'). Missing cells are NaN.
+    """
+    columns = buffer['columns']
+    previous_idx = buffer['index'].get(row['Player'])
+    if previous_idx is not None:
+        buffer['live'][previous_idx] = False
+    row_idx = buffer['size']
+    buffer['index'][row['Player']] = row_idx
+    buffer['live'].append(True)
+    buffer['size'] += 1
+    for name, value in row.items():
+        if name not in columns:
+            columns[name] = [np.nan] * row_idx
+        columns[name].append(value)
+    for values in columns.values():
+        if len(values) < buffer['size']:
+            values.append(np.nan)
+
+def ingest_player_stats(buffers, player_stats_data):
+    """Streams one team's players/statistics response into the per-group buffers."""
+    for p_data in player_stats_data:
+        if not p_data.get('teams'): continue
+        team_level_data = p_data['teams'][0]
+        base_stats = {'Player': p_data.get('player', {}).get('name'), 'Tm': team_level_data.get('team', {}).get('name')}
+        for group in team_level_data.get('groups', []):
+            buffer = buffers.get(group.get('name'))
+            if buffer is None: continue
+            row = dict(base_stats)
+            for s in group.get('statistics', []):
+                row[s['name']] = s['value']
+            append_stat_row(buffer, row)
+
+def stat_buffer_to_dataframe(buffer):
+    if not buffer['size']:
+        return pd.DataFrame()
+    return pd.DataFrame(buffer['columns'])[buffer['live']]
+
+# --- BETTING ODDS ENGINE ---
+def flatten_odds(odds_data):
+    """
+    Flattens every bookmaker's Handicap and Total markets for the season into one table
+    with a row per quoted value: GameID, Bookmaker, Market, Side, Line.
+    Handicap values come back as [away, home]; Total values as "Over 45.5" / "Under 45.5".
+    """
+    columns = {'GameID': [], 'Bookmaker': [], 'Market': [], 'Side': [], 'Raw': []}
+    for game_odds in odds_data:
+        game_id = game_odds.get('game', {}).get('id')
+        for bookmaker in game_odds.get('bookmakers') or []:
+            book_name = bookmaker.get('name') or bookmaker.get('id')
+            for bet in bookmaker.get('bets', []):
+                market = bet.get('name')
+                if market not in ('Handicap', 'Total'): continue
+                for i, value in enumerate(bet.get('values', [])[:2]):
+                    raw = str(value.get('value', ''))
+                    if market == 'Handicap':
+                        side = 'Away' if i == 0 else 'Home'
+                    else:
+                        side = raw.split(' ', 1)[0] if raw.startswith(('Over ', 'Under ')) else 'Total'
+                    columns['GameID'].append(game_id)
+                    columns['Bookmaker'].append(book_name)
+                    columns['Market'].append(market)
+                    columns['Side'].append(side)
+                    columns['Raw'].append(raw)
+
+    flat = pd.DataFrame(columns)
+    flat['GameID'] = pd.to_numeric(flat['GameID'], errors='coerce').astype('Int64')
+    flat['Line'] = pd.to_numeric(flat['Raw'].astype(str).str.replace(r'^(Over|Under)\s+', '', regex=True), errors='coerce')
+    return flat.dropna(subset=['GameID', 'Line']).drop(columns=['Raw'])
+
+def format_line(values, signed=True):
+    """Formats lines like '-3.5' / '+3.5' (or '47.5' unsigned); a signed line of 0 (either sign) is a pick'em, 'PK'."""
+    fmt = '{:+g}' if signed else '{:g}'
+    return values.map(lambda v: 'N/A' if pd.isna(v) else 'PK' if signed and v == 0 else fmt.format(v + 0.0))
+
+def build_consensus_odds(odds_flat, schedule_df):
+    """Aggregates the flattened odds into per-game consensus lines and joins them to the schedule."""
+    home_lines = odds_flat[(odds_flat['Market'] == 'Handicap') & (odds_flat['Side'] == 'Home')]
+    # Use each bookmaker's "Over" quote, falling back to a bare number when no Over/Under pair is given
+    totals = odds_flat[(odds_flat['Market'] == 'Total') & (odds_flat['Side'] != 'Under')]
+    totals = totals.drop_duplicates(subset=['GameID', 'Bookmaker'], keep='first')
+
+    spread_stats = home_lines.groupby('GameID')['Line'].agg(['median', 'mean', 'std', 'count'])
+    spread_stats.columns = ['Home_Line_Median', 'Home_Line_Mean', 'Home_Line_StdDev', 'Home_Line_Count']
+    total_stats = totals.groupby('GameID')['Line'].agg(['median', 'mean', 'std', 'count'])
+    total_stats.columns = ['Total_Median', 'Total_Mean', 'Total_StdDev', 'Total_Count']
+    num_books = odds_flat.groupby('GameID')['Bookmaker'].nunique().rename('Num_Bookmakers')
+    consensus = pd.concat([spread_stats, total_stats, num_books], axis=1)
+
+    teams = schedule_df[['GameID', 'Home Team', 'Away Team']].copy()
+    teams['GameID'] = pd.to_numeric(teams['GameID'], errors='coerce').astype('Int64')
+    teams = teams.dropna(subset=['GameID']).drop_duplicates(subset=['GameID']).set_index('GameID')
+    odds_df = teams.join(consensus, how='inner')
+
+    # A market quoted by a single bookmaker has no dispersion, so report 0; an unquoted market stays NaN
+    for market in ['Home_Line', 'Total']:
+        single_quote = odds_df[f'{market}_Count'] == 1
+        odds_df.loc[single_quote, f'{market}_StdDev'] = 0.0
+    numeric_cols = ['Home_Line_Median', 'Home_Line_Mean', 'Home_Line_StdDev', 'Total_Median', 'Total_Mean', 'Total_StdDev']
+    odds_df[numeric_cols] = odds_df[numeric_cols].round(2)
+
+    home_line = odds_df['Home_Line_Median']
+    odds_df['Home_Spread'] = odds_df['Home Team'] + ' ' + format_line(home_line)
+    odds_df['Away_Spread'] = odds_df['Away Team'] + ' ' + format_line(-home_line)
+    odds_df['Consensus_Spread'] = np.where(
+        home_line.isna(), 'N/A',
+        np.where(home_line < 0, odds_df['Home_Spread'], odds_df['Away_Spread'])
+    )
+    odds_df['Over_Under'] = format_line(odds_df['Total_Median'], signed=False)
+
+    cols = ['Home_Spread', 'Away_Spread', 'Consensus_Spread', 'Over_Under',
+            'Home_Line_Median', 'Home_Line_Mean', 'Home_Line_StdDev',
+            'Total_Median', 'Total_Mean', 'Total_StdDev', 'Num_Bookmakers']
+    return odds_df[cols].reset_index()
+
 def calculate_nfl_week(df):
     print("  -> Calculating week numbers from game dates...")
     df['game_date'] = pd.to_datetime(df['Date'], errors='coerce')
@@ -74,19 +200,7 @@ def calculate_nfl_week(df):
     df.drop(columns=['game_date'], inplace=True)
     return df
 
-if __name__ == "__main__":
-    if not API_KEY:
-        print("❌ ERROR: AMERICAN_FOOTBALL_API_KEY secret not found.")
-        exit()
-
-    print("Authenticating to Google Sheets...")
-    try:
-        gc = get_gspread_client()
-        spreadsheet = gc.open_by_key(SPREADSHEET_KEY)
-    except Exception as e:
-        print(f"❌ CRITICAL ERROR: Could not connect to Google Sheets. Error: {e}")
-        exit()
-
+def fetch_schedule(publish):
     print(f"\n--- Fetching Official Schedule from API ({CURRENT_YEAR}) ---")
     schedule_df = pd.DataFrame() # Initialize empty dataframe
     try:
@@ -114,70 +228,55 @@ if __name__ == "__main__":
             schedule_df = calculate_nfl_week(schedule_df)
             schedule_df = schedule_df[schedule_df['Week'] > 0].copy()
             cols = ['GameID', 'Week', 'Date', 'Time', 'Away Team', 'Home Team', 'Venue_City', 'Venue_Country']
-            write_to_sheet(spreadsheet, "Schedule", schedule_df[cols])
+            publish("Schedule", schedule_df[cols])
     except Exception as e:
         print(f"❌ Could not process Schedule from API: {e}")
-        
+    return schedule_df
+
+def fetch_standings(publish):
     print(f"\n--- Fetching Team Standings from API ({CURRENT_YEAR}) ---")
     try:
         standings_data = get_api_data("standings", {"league": "1", "season": str(CURRENT_YEAR)})
         if standings_data:
             all_teams_stats = [{'Tm': t.get('team',{}).get('name'),'W':t.get('won'),'L':t.get('lost'),'T':t.get('ties'),'PF':t.get('points',{}).get('for'),'PA':t.get('points',{}).get('against')} for t in standings_data]
             df = pd.DataFrame(all_teams_stats)
-            write_to_sheet(spreadsheet, "O_Team_Overall", df[['Tm', 'W', 'L', 'T', 'PF']].copy())
-            write_to_sheet(spreadsheet, "D_Overall", df[['Tm', 'PA']].copy())
+            publish("O_Team_Overall", df[['Tm', 'W', 'L', 'T', 'PF']].copy())
+            publish("D_Overall", df[['Tm', 'PA']].copy())
     except Exception as e:
         print(f"❌ Could not process Team Standings: {e}")
 
-    for year_to_fetch in [CURRENT_YEAR, PREVIOUS_YEAR]:
-        print(f"\n--- Fetching Player Stats from API ({year_to_fetch}) ---")
-        
-        all_players_stats = [] 
-        
-        try:
-            teams_data = get_api_data("teams", {"league": "1", "season": year_to_fetch})
-            team_ids = [team['id'] for team in teams_data if team]
-            for team_id in team_ids:
-                print(f"  -> Fetching players for team ID: {team_id}")
-                player_stats_data = get_api_data("players/statistics", {"team": team_id, "season": year_to_fetch})
-                if player_stats_data: all_players_stats.extend(player_stats_data)
-                time.sleep(1.5)
-
-            if all_players_stats:
-                passing, rushing, receiving = [], [], []
-                
-                for p_data in all_players_stats:
-                    player_info = p_data.get('player', {})
-                    if not p_data.get('teams'): continue
-                    team_level_data = p_data['teams'][0]
-                    team_info = team_level_data.get('team', {})
-                    base_stats = {'Player':player_info.get('name'),'Tm':team_info.get('name')}
-                    for group in team_level_data.get('groups', []):
-                        stats = {s['name']: s['value'] for s in group.get('statistics', [])}
-                        if group.get('name') == 'Passing': passing.append({**base_stats, **stats})
-                        elif group.get('name') == 'Rushing': rushing.append({**base_stats, **stats})
-                        elif group.get('name') == 'Receiving': receiving.append({**base_stats, **stats})
-                
-                prefix = "" if year_to_fetch == CURRENT_YEAR else f"{year_to_fetch}_"
-                
-                df_passing = pd.DataFrame(passing)
-                df_rushing = pd.DataFrame(rushing)
-                df_receiving = pd.DataFrame(receiving)
-
-                if not df_passing.empty: df_passing.drop_duplicates(subset=['Player'], keep='last', inplace=True)
-                if not df_rushing.empty: df_rushing.drop_duplicates(subset=['Player'], keep='last', inplace=True)
-                if not df_receiving.empty: df_receiving.drop_duplicates(subset=['Player'], keep='last', inplace=True)
-
-                write_to_sheet(spreadsheet, f"{prefix}O_Player_Passing", df_passing)
-                write_to_sheet(spreadsheet, f"{prefix}O_Player_Rushing", df_rushing)
-                write_to_sheet(spreadsheet, f"{prefix}O_Player_Receiving", df_receiving)
-        except Exception as e:
-            print(f"❌ Could not process Player Stats for {year_to_fetch}: {e}")
+def fetch_player_stats(publish, year_to_fetch):
+    print(f"\n--- Fetching Player Stats from API ({year_to_fetch}) ---")
+    
+    buffers = {group: new_stat_buffer() for group in PLAYER_STAT_GROUPS}
+    
+    try:
+        teams_data = get_api_data("teams", {"league": "1", "season": year_to_fetch})
+        team_ids = [team['id'] for team in teams_data if team]
+        for team_id in team_ids:
+            print(f"  -> Fetching players for team ID: {team_id}")
+            player_stats_data = get_api_data("players/statistics", {"team": team_id, "season": year_to_fetch})
+            # Parse this team's payload into the buffers and drop it before the next request
+            ingest_player_stats(buffers, player_stats_data)
+            del player_stats_data
+            time.sleep(1.5)
+
+        if any(buffer['size'] for buffer in buffers.values()):
+            prefix = "" if year_to_fetch == CURRENT_YEAR else f"{year_to_fetch}_"
             
+            for group in PLAYER_STAT_GROUPS:
+                df_group = stat_buffer_to_dataframe(buffers.pop(group))
+                publish(f"{prefix}O_Player_{group}", df_group)
+    except Exception as e:
+        print(f"❌ Could not process Player Stats for {year_to_fetch}: {e}")
+
+def fetch_depth_charts(publish):
     print("\n--- Scraping FootballGuys.com Depth Charts ---")
+    depth_df = pd.DataFrame()
     try:
         url = "https://www.footballguys.com/depth-charts"
-        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'})
+        response = http_client.get(url, headers={'User-Agent': 'Mozilla/5.0'})
+        response.raise_for_status()
         soup = BeautifulSoup(response.content, 'html.parser')
         team_containers = soup.find_all('div', class_='depth-chart')
         all_players = []
@@ -198,89 +297,60 @@ if __name__ == "__main__":
                             status = status_match.group(1) if status_match else 'Healthy'
                             all_players.append({'Team': team_name, 'Position': position, 'Depth': i + 1, 'Player': clean_name, 'Status': status})
         if all_players:
-            write_to_sheet(spreadsheet, "Depth_Charts", pd.DataFrame(all_players))
+            depth_df = pd.DataFrame(all_players)
+            publish("Depth_Charts", depth_df)
     except Exception as e:
         print(f"❌ Could not process Depth Charts: {e}")
+    return depth_df
 
-    # --- NEW: Fetch Betting Odds ---
+def fetch_betting_odds(publish, schedule_df):
     print(f"\n--- Fetching Betting Odds from API ({CURRENT_YEAR}) ---")
+    odds_df = pd.DataFrame()
     try:
-        odds_data = get_api_data("odds", {"league": "1", "season": str(CURRENT_YEAR)})
-        parsed_odds_list = []
-        
-        # Get GameID -> TeamName mapping from the schedule_df we already built
-        # This is crucial to know who the spread applies to
+        # The schedule tells us who each spread applies to
         if schedule_df.empty:
-             print("  -> ERROR: Schedule data is missing, cannot map odds to teams.")
-        else:
-            game_to_teams_map = schedule_df.set_index('GameID')[['Home Team', 'Away Team']].to_dict('index')
+            print("  -> ERROR: Schedule data is missing, cannot map odds to teams.")
+            return odds_df
 
-            for game_odds in odds_data:
-                game_id = game_odds.get('game', {}).get('id')
-                
-                # Find the teams for this game
-                team_info = game_to_teams_map.get(str(game_id)) # Use string for lookup
-                if not team_info:
-                    continue # Skip odds if we don't know the teams for this game
-
-                home_team = team_info['Home Team']
-                away_team = team_info['Away Team']
-
-                if not game_odds.get('bookmakers'):
-                    continue
-                
-                # Just take the first bookmaker for simplicity
-                bookmaker = game_odds['bookmakers'][0]
-                
-                spread, over_under, home_spread, away_spread = "N/A", "N/A", "N/A", "N/A"
-
-                for bet in bookmaker.get('bets', []):
-                    if bet.get('name') == "Handicap":
-                        try:
-                            # The API returns two spread values
-                            val1 = bet['values'][0]['value']
-                            val2 = bet['values'][1]['value']
-                            
-                            # The 'value' from the API corresponds to the *Home Team* and *Away Team* in that order
-                            away_spread = f"{away_team} {val1}"
-                            home_spread = f"{home_team} {val2}"
-                            
-                            # Create a simple spread string
-                            if val2.startswith('-'):
-                                spread = f"{home_team} {val2}"
-                            else:
-                                spread = f"{away_team} {val1}"
-                        except (IndexError, KeyError):
-                            pass # Keep as "N/A"
-                    
-                    if bet.get('name') == "Total":
-                        try:
-                            # Find the "Over" value to get the total
-                            total_val = next(v['value'] for v in bet['values'] if v['value'].startswith('Over '))
-                            over_under = total_val.replace('Over ', '')
-                        except (StopIteration, IndexError, KeyError):
-                             try:
-                                 # Fallback if it's just a number
-                                 over_under = bet['values'][0]['value']
-                             except (IndexError, KeyError):
-                                 pass # Keep as "N/A"
-
-                parsed_odds_list.append({
-                    "GameID": game_id,
-                    "Home_Spread": home_spread,
-                    "Away_Spread": away_spread,
-                    "Consensus_Spread": spread,
-                    "Over_Under": over_under
-                })
-        
-        if parsed_odds_list:
-            odds_df = pd.DataFrame(parsed_odds_list)
-            write_to_sheet(spreadsheet, "Betting_Odds", odds_df)
+        odds_data = get_api_data("odds", {"league": "1", "season": str(CURRENT_YEAR)})
+        odds_flat = flatten_odds(odds_data)
+        print(f"  -> Flattened {len(odds_flat)} quotes from {odds_flat['Bookmaker'].nunique()} bookmakers.")
+        odds_df = build_consensus_odds(odds_flat, schedule_df)
+        if not odds_df.empty:
+            publish("Betting_Odds", odds_df)
         else:
             print("  -> No odds data was parsed.")
-
     except Exception as e:
         print(f"❌ Could not process Betting Odds: {e}")
+    return odds_df
+
+def run_scraper(publish):
+    """Fetches every dataset once; publish(tab_name, dataframe) sends each table to the target spreadsheets."""
+    schedule_df = fetch_schedule(publish)
+    fetch_standings(publish)
+    for year_to_fetch in [CURRENT_YEAR, PREVIOUS_YEAR]:
+        fetch_player_stats(publish, year_to_fetch)
+    fetch_depth_charts(publish)
+    fetch_betting_odds(publish, schedule_df)
+    return schedule_df
+
+if __name__ == "__main__":
+    if not API_KEY:
+        print("❌ ERROR: AMERICAN_FOOTBALL_API_KEY secret not found.")
+        exit()
+
+    print("Authenticating to Google Sheets...")
+    try:
+        gc = get_gspread_client()
+        targets = load_publish_targets()
+        opened_targets = publisher.open_targets(gc, targets)
+    except Exception as e:
+        print(f"❌ CRITICAL ERROR: Could not connect to Google Sheets. Error: {e}")
+        exit()
+    if not opened_targets:
+        print("❌ CRITICAL ERROR: None of the target spreadsheets could be opened.")
+        exit()
+    print(f"  -> Publishing to {len(opened_targets)} of {len(targets)} spreadsheet(s): {', '.join(t['name'] for t, _ in opened_targets)}")
 
-        
+    run_scraper(publisher.make_table_publisher(opened_targets, write_to_sheet))
     print("\n✅ Scraper script finished.")
@@ -0,0 +1,46 @@
+"""
+Shared configuration for pfr_scraper, run_predictions, run_daemon and diagnostic_checker.
+
+Data is fetched and predicted once, then published to every target spreadsheet.
+Targets come from the PUBLISH_TARGETS environment variable (a JSON string) or the JSON
+file named by PUBLISH_TARGETS_FILE (default: publish_targets.json):
+
+    [
+      {"name": "main", "key": "<spreadsheet key>"},
+      {"name": "league-b", "key": "<spreadsheet key>", "tabs": ["Week_*_Predictions", "Betting_Odds"]}
+    ]
+
+"tabs" is an optional list of tab-name patterns (fnmatch style); leave it out to publish
+every tab. SPREADSHEET_KEY is the source spreadsheet the prediction step reads back from,
+so it always receives every tab whether or not it is listed.
+"""
+import json
+import os
+
+# --- CONFIGURATION ---
+SPREADSHEET_KEY = "1NPpxs5wMkDZ8LJhe5_AC3FXR_shMHxQsETdaiAJifio"
+PUBLISH_TARGETS_FILE = os.getenv('PUBLISH_TARGETS_FILE', 'publish_targets.json')
+PUBLISH_MAX_WORKERS = 4
+
+def load_publish_targets():
+    """Returns the list of {'name', 'key', 'tabs'} targets, with the source spreadsheet first."""
+    raw_targets = []
+    if os.getenv('PUBLISH_TARGETS'):
+        raw_targets = json.loads(os.getenv('PUBLISH_TARGETS'))
+    elif os.path.exists(PUBLISH_TARGETS_FILE):
+        with open(PUBLISH_TARGETS_FILE) as f:
+            raw_targets = json.load(f)
+
+    targets = []
+    for i, target in enumerate(raw_targets, start=1):
+        if not target.get('key'):
+            raise ValueError(f"Publish target #{i} is missing a spreadsheet 'key'.")
+        targets.append({'name': target.get('name') or target['key'], 'key': target['key'], 'tabs': target.get('tabs')})
+
+    source = [t for t in targets if t['key'] == SPREADSHEET_KEY]
+    if source:
+        source[0]['tabs'] = None
+        targets = source[:1] + [t for t in targets if t['key'] != SPREADSHEET_KEY]
+    else:
+        targets.insert(0, {'name': 'source', 'key': SPREADSHEET_KEY, 'tabs': None})
+    return targets
@@ -0,0 +1,43 @@
+"""
+Fan-out publishing: write one set of results to many spreadsheets at once.
+
+Each target is opened once, and writes to different targets run in parallel. A failure
+in one target is reported and skipped; the other targets still get their writes.
+"""
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline_config import PUBLISH_MAX_WORKERS
+
+def wants_tab(target, tab_name):
+    return target['tabs'] is None or any(fnmatch.fnmatchcase(tab_name, pattern) for pattern in target['tabs'])
+
+def _map_targets(fn, items, name_of):
+    """Runs fn over items in parallel, catching and reporting each failure. Returns [(result, error)]."""
+    def run_isolated(item):
+        try:
+            return fn(item), None
+        except Exception as e:
+            print(f"❌ Target '{name_of(item)}' failed: {e}")
+            return None, e
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(PUBLISH_MAX_WORKERS, len(items))) as pool:
+        return list(pool.map(run_isolated, items))
+
+def open_targets(gc, targets):
+    """Opens every target spreadsheet. Returns [(target, spreadsheet)] for the ones that opened."""
+    results = _map_targets(lambda target: gc.open_by_key(target['key']), targets, lambda target: target['name'])
+    return [(target, spreadsheet) for target, (spreadsheet, error) in zip(targets, results) if error is None]
+
+def fan_out(opened_targets, fn):
+    """Calls fn(spreadsheet, target) for every opened target in parallel. Returns the names of failed targets."""
+    results = _map_targets(lambda pair: fn(pair[1], pair[0]), opened_targets, lambda pair: pair[0]['name'])
+    return [target['name'] for (target, _), (_, error) in zip(opened_targets, results) if error is not None]
+
+def make_table_publisher(opened_targets, write_fn):
+    """Returns publish(tab_name, dataframe), which writes the table to every target that wants the tab."""
+    def publish(tab_name, dataframe):
+        fan_out(opened_targets, lambda spreadsheet, target: write_fn(spreadsheet, tab_name, dataframe) if wants_tab(target, tab_name) else None)
+    return publish
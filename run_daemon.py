@@ -0,0 +1,139 @@
+import time
+from datetime import datetime, timezone, timedelta
+
+import pfr_scraper
+import publisher
+import run_predictions
+from pipeline_config import SPREADSHEET_KEY, load_publish_targets
+
+# --- CONFIGURATION ---
+# Full scrape (standings, player stats, schedule) runs this often; everything else is a volatile refresh
+FULL_REFRESH_HOURS = 24
+# (hours until next kickoff, minutes between volatile refreshes) - first matching row wins
+REFRESH_SCHEDULE = [
+    (3, 10),
+    (24, 30),
+    (72, 120),
+]
+IDLE_REFRESH_MINUTES = 360
+VOLATILE_TABS = ["Betting_Odds", "Depth_Charts"]
+
+def refresh_interval(now_utc, schedule_df):
+    """Picks the sleep interval from REFRESH_SCHEDULE based on how close the next kickoff is."""
+    future_games = schedule_df[schedule_df['datetime'] > now_utc]
+    if future_games.empty:
+        return timedelta(minutes=IDLE_REFRESH_MINUTES)
+    hours_to_kickoff = (future_games['datetime'].min() - now_utc).total_seconds() / 3600
+    for max_hours, minutes in REFRESH_SCHEDULE:
+        if hours_to_kickoff <= max_hours:
+            return timedelta(minutes=minutes)
+    return timedelta(minutes=IDLE_REFRESH_MINUTES)
+
+def as_sheet_dataframe(df):
+    """Makes a freshly scraped DataFrame look like one read back from the sheet."""
+    df = df.astype(str)
+    if 'Player' in df.columns:
+        df['Player_Normalized'] = df['Player'].apply(run_predictions.normalize_player_name)
+    return df
+
+def game_fingerprints(dataframes, current_week):
+    """
+    Summarizes everything volatile that feeds a game's prompt: consensus odds, the healthy
+    skill players picked from the depth chart, and the weather forecast.
+    Returns ({GameID: fingerprint}, {GameID: weather string}).
+    """
+    schedule_df = dataframes['Schedule']
+    depth_chart_df = dataframes.get('Depth_Charts')
+    fingerprints, weather_by_game = {}, {}
+    for _, game in schedule_df[schedule_df['Week'] == current_week].iterrows():
+        game_id = game['GameID']
+        weather = run_predictions.get_weather_forecast(
+            game.get('Venue_City', 'N/A'), game.get('Venue_Country', 'N/A'), game['Home Team'], game['datetime']
+        )
+        players = ()
+        if depth_chart_df is not None:
+            players = tuple(
+                tuple(sorted(run_predictions.get_healthy_skill_players(depth_chart_df[depth_chart_df['Team_Full'] == team])))
+                for team in (game['Home Team'], game['Away Team'])
+            )
+        odds = tuple(str(game.get(col, 'N/A')) for col in ('Consensus_Spread', 'Over_Under'))
+        fingerprints[game_id] = (odds, players, weather)
+        weather_by_game[game_id] = weather
+    return fingerprints, weather_by_game
+
+def main():
+    if not pfr_scraper.API_KEY:
+        print("❌ CRITICAL ERROR: AMERICAN_FOOTBALL_API_KEY secret not found.")
+        return
+
+    # Authenticate once; the client and spreadsheet handle stay warm for the life of the process
+    print("Authenticating with Google Sheets...")
+    gc = run_predictions.get_gspread_client()
+    spreadsheet = gc.open_by_key(SPREADSHEET_KEY)
+
+    opened_targets = []
+    raw_dataframes = None
+    store = None
+    last_full_refresh = None
+    fingerprints = {}
+    predicted_week = None
+
+    while True:
+        now_utc = datetime.now(timezone.utc)
+        try:
+            if last_full_refresh is None or now_utc - last_full_refresh >= timedelta(hours=FULL_REFRESH_HOURS):
+                print(f"\n=== Full refresh at {now_utc:%Y-%m-%d %H:%M} UTC ===")
+                # Re-open targets on each full refresh so a target that failed earlier gets retried
+                opened_targets = publisher.open_targets(gc, load_publish_targets())
+                publish = publisher.make_table_publisher(opened_targets, pfr_scraper.write_to_sheet)
+                pfr_scraper.run_scraper(publish)
+                raw_dataframes = run_predictions.load_sheet_dataframes(spreadsheet)
+                last_full_refresh = now_utc
+                fingerprints = {}
+            else:
+                print(f"\n=== Volatile refresh at {now_utc:%Y-%m-%d %H:%M} UTC ===")
+                odds_df = pfr_scraper.fetch_betting_odds(publish, raw_dataframes.get('Schedule'))
+                depth_df = pfr_scraper.fetch_depth_charts(publish)
+                for title, df in zip(VOLATILE_TABS, [odds_df, depth_df]):
+                    if not df.empty:
+                        raw_dataframes[title] = as_sheet_dataframe(df)
+
+            # Normalize copies so the cached raw tables are never mutated
+            dataframes = run_predictions.prepare_dataframes({k: v.copy() for k, v in raw_dataframes.items()})
+            if dataframes is not None:
+                current_week = run_predictions.get_current_week(dataframes['Schedule'], now_utc)
+                if not current_week:
+                    print("  -> No future games found to predict.")
+                else:
+                    store = run_predictions.load_feature_store(dataframes['team_name_map'], store)
+                    dataframes['feature_store'] = store
+                    if current_week != predicted_week:
+                        fingerprints = {}
+                    new_fingerprints, weather_by_game = game_fingerprints(dataframes, current_week)
+                    changed = [gid for gid, fp in new_fingerprints.items() if fingerprints.get(gid) != fp]
+                    if changed:
+                        print(f"  -> {len(changed)} game(s) changed since last refresh, re-predicting.")
+                        rows = run_predictions.run_prediction_mode(
+                            dataframes, now_utc, current_week,
+                            game_ids=None if not fingerprints else changed,
+                            weather_by_game=weather_by_game,
+                        )
+                        run_predictions.publish_predictions(opened_targets, current_week, rows, replace=not fingerprints)
+                    else:
+                        print("  -> No odds, depth chart or weather changes; predictions are current.")
+                    fingerprints = new_fingerprints
+                    predicted_week = current_week
+                interval = refresh_interval(now_utc, dataframes['Schedule'])
+            else:
+                interval = timedelta(minutes=IDLE_REFRESH_MINUTES)
+        except Exception as e:
+            print(f"❌ Refresh failed, will retry: {e}")
+            interval = timedelta(minutes=REFRESH_SCHEDULE[0][1])
+
+        if last_full_refresh is not None:
+            interval = min(interval, last_full_refresh + timedelta(hours=FULL_REFRESH_HOURS) - datetime.now(timezone.utc))
+        print(f"  -> Sleeping {interval.total_seconds() / 60:.0f} minutes.")
+        time.sleep(max(interval.total_seconds(), 60))
+
+if __name__ == "__main__":
+    main()
@@ -5,17 +5,18 @@ import time
 import pandas as pd
 import pytz
 import gspread
-import requests
+import http_client
+import baseline_model
+import feature_store
+import publisher
 from dotenv import load_dotenv
+from pipeline_config import SPREADSHEET_KEY, load_publish_targets
 from datetime import datetime, timezone, timedelta
-import vertexai
-from vertexai.generative_models import GenerativeModel, HarmCategory, HarmBlockThreshold
-from gspread_formatting import CellFormat, format_cell_range
+# vertexai and gspread_formatting are slow to import; they are loaded inside run_prediction_mode
 
 load_dotenv()
 
 # --- CONFIGURATION ---
-SPREADSHEET_KEY = "1NPpxs5wMkDZ8LJhe5_AC3FXR_shMHxQsETdaiAJifio"
 FOOTBALL_API_KEY = os.getenv('AMERICAN_FOOTBALL_API_KEY')
 FOOTBALL_API_HOST = "v1.american-football.api-sports.io"
 YEAR = 2025
@@ -78,14 +79,16 @@ def get_api_data(endpoint, params):
     url = f"https://{FOOTBALL_API_HOST}/{endpoint}"
     headers = {"x-rapidapi-key": FOOTBALL_API_KEY, "x-rapidapi-host": FOOTBALL_API_HOST}
     try:
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = http_client.get(url, headers=headers, params=params)
         response.raise_for_status()
         return response.json().get('response', [])
-    except requests.exceptions.RequestException as e:
+    except http_client.REQUEST_ERRORS as e:
         print(f"  -> API request failed for endpoint '{endpoint}': {e}")
         return []
 
 # --- NWS WEATHER HELPER FUNCTION (FREE, NO KEY) ---
+NWS_GRID_CACHE = {}
+
 def get_weather_forecast(city, country, home_team, game_datetime_utc):
     """
     Fetches weather for the game's specific venue using the free NWS API.
@@ -115,12 +118,16 @@ def get_weather_forecast(city, country, home_team, game_datetime_utc):
     }
     
     try:
+        # The stadium -> forecast grid mapping never changes, so only look it up once per process
         points_url = f"https://api.weather.gov/points/{lat:.4f},{lon:.4f}"
-        response = requests.get(points_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        grid_url = response.json()['properties']['forecast']
+        grid_url = NWS_GRID_CACHE.get(points_url)
+        if grid_url is None:
+            response = http_client.get(points_url, headers=headers, timeout=10)
+            response.raise_for_status()
+            grid_url = response.json()['properties']['forecast']
+            NWS_GRID_CACHE[points_url] = grid_url
         
-        response = requests.get(grid_url, headers=headers, timeout=10)
+        response = http_client.get(grid_url, headers=headers, timeout=10)
         response.raise_for_status()
         forecast_data = response.json()
         
@@ -143,7 +150,7 @@ def get_weather_forecast(city, country, home_team, game_datetime_utc):
                 
         return "Forecast data not found for game day."
 
-    except requests.exceptions.RequestException as e:
+    except http_client.REQUEST_ERRORS as e:
         print(f"  -> NWS Weather API request failed: {e}")
         return "Error fetching NWS weather data."
     except Exception as e:
@@ -159,6 +166,11 @@ def get_top_healthy_player_names(team_df, position, num_players=1):
         players.append("[Not Available]")
     return players
 
+SKILL_POSITION_DEPTH = {'QB': 1, 'RB': 2, 'WR': 3, 'TE': 1}
+
+def get_healthy_skill_players(team_df):
+    return {p for pos, num in SKILL_POSITION_DEPTH.items() for p in get_top_healthy_player_names(team_df, pos, num) if p != "[Not Available]"}
+
 def find_or_create_row(worksheet, away_team, home_team, kickoff_str):
     all_sheet_data = worksheet.get_all_values()
     for i, row in enumerate(all_sheet_data[1:], start=2):
@@ -198,195 +210,321 @@ def clean_json_response(text):
         return match.group(1)
     return text.strip()
 
-def run_prediction_mode(spreadsheet, dataframes, now_utc, current_week):
-    eastern_tz = pytz.timezone('US/Eastern')
-    schedule_df = dataframes['Schedule']
-    
-    print(f"  -> Generating predictions for Week {current_week}")
+_PREDICTION_MODEL = None
+
+PREDICTION_HEADERS = ["Away Team", "Home Team", "Kickoff", "Predicted Winner", "Predicted Score", "Prediction Analysis", "Baseline Winner", "Baseline Score"]
+
+def compute_baseline(dataframes, games_df):
+    """Runs the vectorized baseline over games_df using O_Team_Overall (W/L/T/PF) and D_Overall (PA)."""
+    standings_df = dataframes.get('O_Team_Overall', pd.DataFrame(columns=['Team_Full']))
+    defense_df = dataframes.get('D_Overall')
+    if defense_df is not None and 'PA' in defense_df.columns and 'PA' not in standings_df.columns:
+        standings_df = standings_df.merge(defense_df[['Team_Full', 'PA']].drop_duplicates(subset=['Team_Full']), on='Team_Full', how='left')
+    return baseline_model.predict_baseline(games_df, baseline_model.team_ratings(standings_df))
+
+def empty_baseline(games_df):
+    """Baseline frame for games_df with no scores, used when the baseline itself can't be computed."""
+    return pd.DataFrame({
+        'Baseline_Winner': 'N/A',
+        'Baseline_Score': 'N/A',
+        'Baseline_Home_Win_Prob': float('nan'),
+    }, index=games_df.index)
+
+def get_prediction_model():
+    """Initializes Vertex AI once per process and reuses the model on later calls."""
+    global _PREDICTION_MODEL
+    if _PREDICTION_MODEL is None:
+        import vertexai
+        from vertexai.generative_models import GenerativeModel
+        print("--- Initializing Vertex AI ---")
+        vertexai.init()
+        _PREDICTION_MODEL = GenerativeModel("gemini-2.5-pro")
+    return _PREDICTION_MODEL
+
+def write_predictions(spreadsheet, current_week, rows, replace=True):
+    """
+    Writes prediction rows (laid out as PREDICTION_HEADERS) to Week_N_Predictions.
+    replace=True rebuilds the tab in one update; otherwise each game's row is updated in place.
+    """
+    from gspread_formatting import CellFormat, format_cell_range
+
     sheet_name = f"Week_{current_week}_Predictions"
     try:
         worksheet = spreadsheet.worksheet(sheet_name)
-        worksheet.clear()
-        time.sleep(1)
+        if replace:
+            worksheet.clear()
+            time.sleep(1)
     except gspread.WorksheetNotFound:
-        worksheet = spreadsheet.add_worksheet(title=sheet_name, rows=100, cols=6)
+        worksheet = spreadsheet.add_worksheet(title=sheet_name, rows=100, cols=len(PREDICTION_HEADERS))
+        replace = True
     
-    headers = ["Away Team", "Home Team", "Kickoff", "Predicted Winner", "Predicted Score", "Prediction Analysis"]
-    worksheet.update('A1', [headers])
-    worksheet.freeze(rows=1)
-    fmt = CellFormat(wrapStrategy='WRAP')
-    format_cell_range(worksheet, 'F:F', fmt)
+    if replace:
+        headers = PREDICTION_HEADERS
+        if worksheet.col_count < len(headers):
+            worksheet.add_cols(len(headers) - worksheet.col_count)
+        worksheet.update('A1', [headers] + rows)
+        worksheet.freeze(rows=1)
+        fmt = CellFormat(wrapStrategy='WRAP')
+        format_cell_range(worksheet, 'F:F', fmt)
+    else:
+        for row in rows:
+            row_num = find_or_create_row(worksheet, row[0], row[1], row[2])
+            worksheet.update(f'D{row_num}:H{row_num}', [row[3:]])
+    print(f"  -> Wrote {len(rows)} prediction(s) to '{sheet_name}'.")
 
-    this_weeks_games = schedule_df[schedule_df['Week'] == current_week]
+def publish_predictions(opened_targets, current_week, rows, replace=True):
+    """Writes the predictions and tidies tab visibility on every target that wants the week's tab."""
+    sheet_name = f"Week_{current_week}_Predictions"
+
+    def publish(spreadsheet, target):
+        if publisher.wants_tab(target, sheet_name):
+            write_predictions(spreadsheet, current_week, rows, replace)
+        hide_data_sheets(spreadsheet, current_week)
+
+    return publisher.fan_out(opened_targets, publish)
+
+def run_prediction_mode(dataframes, now_utc, current_week, game_ids=None, weather_by_game=None):
+    """
+    Predicts the games of current_week (or only game_ids, if given) and returns one row per
+    game laid out as PREDICTION_HEADERS. Nothing is written here; see publish_predictions.
+    """
+    eastern_tz = pytz.timezone('US/Eastern')
+    schedule_df = dataframes['Schedule']
+    weather_by_game = weather_by_game or {}
+    rows = []
     
-    print("--- Initializing Vertex AI ---")
-    vertexai.init()
-    model = GenerativeModel("gemini-2.5-pro")
+    print(f"  -> Generating predictions for Week {current_week}")
+    this_weeks_games = schedule_df[schedule_df['Week'] == current_week]
+    if game_ids is not None:
+        this_weeks_games = this_weeks_games[this_weeks_games['GameID'].isin(game_ids)]
     
-    safety_settings = {
-        HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-        HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-    }
+    # The baseline scores the whole slate up front; it's written next to the LLM output and used as its fallback
+    try:
+        baseline_df = compute_baseline(dataframes, this_weeks_games)
+    except Exception as e:
+        print(f"  -> WARNING: Could not compute the statistical baseline, continuing without it: {e}")
+        baseline_df = empty_baseline(this_weeks_games)
+
+    try:
+        model = get_prediction_model()
+        from vertexai.generative_models import HarmCategory, HarmBlockThreshold
+        safety_settings = {
+            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+        }
+    except Exception as e:
+        print(f"  -> WARNING: Vertex AI is unavailable, using the statistical baseline for every game: {e}")
+        model = None
     
     depth_chart_df = dataframes.get('Depth_Charts')
     player_stats_current = dataframes.get('player_stats_current')
     team_offense_df = dataframes.get('O_Team_Overall')
+    store = dataframes.get('feature_store')
 
     for index, game in this_weeks_games.iterrows():
-        away_team_full, home_team_full = game['Away Team'], game['Home Team']
-        game_time_utc = game['datetime']
+        try:
+            away_team_full, home_team_full = game['Away Team'], game['Home Team']
+            game_time_utc = game['datetime']
         
-        venue_city = game.get('Venue_City', 'N/A')
-        venue_country = game.get('Venue_Country', 'N/A')
+            venue_city = game.get('Venue_City', 'N/A')
+            venue_country = game.get('Venue_Country', 'N/A')
         
-        print(f"\n--- Predicting: {away_team_full} at {home_team_full} ---")
-        print(f"  -> Venue: {venue_city}, {venue_country}")
+            print(f"\n--- Predicting: {away_team_full} at {home_team_full} ---")
+            print(f"  -> Venue: {venue_city}, {venue_country}")
         
-        kickoff_display_str = game_time_utc.astimezone(eastern_tz).strftime('%Y-%m-%d %I:%M %p %Z')
-        row_num = find_or_create_row(worksheet, away_team_full, home_team_full, kickoff_display_str)
+            kickoff_display_str = game_time_utc.astimezone(eastern_tz).strftime('%Y-%m-%d %I:%M %p %Z')
         
-        # --- Get Weather ---
-        print("  -> Fetching live weather forecast...")
-        weather_forecast_str = get_weather_forecast(
-            venue_city, venue_country, home_team_full, game_time_utc
-        )
-        print(f"  -> Weather: {weather_forecast_str}")
+            # --- Get Weather ---
+            weather_forecast_str = weather_by_game.get(game['GameID'])
+            if weather_forecast_str is None:
+                print("  -> Fetching live weather forecast...")
+                weather_forecast_str = get_weather_forecast(
+                    venue_city, venue_country, home_team_full, game_time_utc
+                )
+            print(f"  -> Weather: {weather_forecast_str}")
+
+            # --- NEW: Get Betting Odds ---
+            spread = game.get('Consensus_Spread', 'N/A')
+            over_under = game.get('Over_Under', 'N/A')
+            betting_str = f"Spread: {spread} | Over/Under: {over_under}"
+            num_books = game.get('Num_Bookmakers')
+            if pd.notna(num_books) and str(num_books) not in ('', 'N/A'):
+                # Sheet values come back as strings, so an unquoted market reads as 'nan'
+                spread_std, total_std = (
+                    'N/A' if pd.isna(value) or str(value).lower() in ('', 'nan') else value
+                    for value in (game.get('Home_Line_StdDev'), game.get('Total_StdDev'))
+                )
+                betting_str += (
+                    f" | Consensus of {num_books} bookmakers"
+                    f" (spread std dev: {spread_std}, total std dev: {total_std})"
+                )
+            print(f"  -> Odds: {betting_str}")
 
-        # --- NEW: Get Betting Odds ---
-        spread = game.get('Consensus_Spread', 'N/A')
-        over_under = game.get('Over_Under', 'N/A')
-        betting_str = f"Spread: {spread} | Over/Under: {over_under}"
-        print(f"  -> Odds: {betting_str}")
-        # --- END NEW ---
+            baseline = baseline_df.loc[index]
+            baseline_winner, baseline_score = baseline['Baseline_Winner'], baseline['Baseline_Score']
+            print(f"  -> Baseline: {baseline_winner} {baseline_score}")
+            # --- END NEW ---
 
-        home_depth_chart = depth_chart_df[depth_chart_df['Team_Full'] == home_team_full]
-        away_depth_chart = depth_chart_df[depth_chart_df['Team_Full'] == away_team_full]
+            home_depth_chart = depth_chart_df[depth_chart_df['Team_Full'] == home_team_full]
+            away_depth_chart = depth_chart_df[depth_chart_df['Team_Full'] == away_team_full]
 
-        pos_config = {'QB': 1, 'RB': 2, 'WR': 3, 'TE': 1}
-        home_player_names = {p for pos, num in pos_config.items() for p in get_top_healthy_player_names(home_depth_chart, pos, num) if p != "[Not Available]"}
-        away_player_names = {p for pos, num in pos_config.items() for p in get_top_healthy_player_names(away_depth_chart, pos, num) if p != "[Not Available]"}
+            home_player_names = get_healthy_skill_players(home_depth_chart)
+            away_player_names = get_healthy_skill_players(away_depth_chart)
         
-        home_player_names_normalized = {normalize_player_name(p) for p in home_player_names}
-        away_player_names_normalized = {normalize_player_name(p) for p in away_player_names}
+            home_player_names_normalized = {normalize_player_name(p) for p in home_player_names}
+            away_player_names_normalized = {normalize_player_name(p) for p in away_player_names}
         
-        home_roster_stats = player_stats_current[player_stats_current['Player_Normalized'].isin(home_player_names_normalized)]
-        away_roster_stats = player_stats_current[player_stats_current['Player_Normalized'].isin(away_player_names_normalized)]
-
-        # --- UPDATED PROMPT (with Weather Rules AND Betting) ---
-        matchup_prompt = f"""
-        You are an expert sports analyst and data scientist. Your task is to provide a detailed prediction analysis for an upcoming NFL game.
-        **Your primary directive is to base your analysis exclusively on the data provided below. Do not use any prior knowledge.**
-        Analyze the matchup between the {away_team_full} (Away) and {home_team_full} (Home).
+            home_roster_stats = player_stats_current[player_stats_current['Player_Normalized'].isin(home_player_names_normalized)]
+            away_roster_stats = player_stats_current[player_stats_current['Player_Normalized'].isin(away_player_names_normalized)]
+
+            # Recent form comes precomputed from the feature store; each lookup is a dict access
+            recent_form_str = "Recent game-by-game data not available."
+            if store is not None and store.backfilling:
+                # The windows still end weeks ago, so "last 3 / last 5" would be mislabelled
+                recent_form_str = "Recent form not available yet (game history is still being backfilled)."
+            elif store is not None:
+                team_form = store.recent_form({home_team_full, away_team_full}, table='teams')
+                home_form = store.recent_form(home_player_names, home_team_full)
+                away_form = store.recent_form(away_player_names, away_team_full)
+                recent_form_str = (
+                    f"Teams:\n{team_form.to_string(index=False)}\n\n"
+                    f"{home_team_full} players:\n{home_form.to_string(index=False)}\n\n"
+                    f"{away_team_full} players:\n{away_form.to_string(index=False)}"
+                )
+
+            # --- UPDATED PROMPT (with Weather Rules AND Betting) ---
+            matchup_prompt = f"""
+            You are an expert sports analyst and data scientist. Your task is to provide a detailed prediction analysis for an upcoming NFL game.
+            **Your primary directive is to base your analysis exclusively on the data provided below. Do not use any prior knowledge.**
+            Analyze the matchup between the {away_team_full} (Away) and {home_team_full} (Home).
         
-        ## AI Analysis Directives:
-        You MUST follow these rules when analyzing the data:
-        1.  **WEATHER:**
-            * **HIGH WIND (20+ mph):** This is the most significant factor. High winds severely NEGATIVELY impact passing yards, passing accuracy (especially deep throws), and all kicking. High wind STRONGLY favors the running game and defense.
-            * **RAIN / SNOW:** These conditions make the ball slippery, increasing fumbles and dropped passes. This NEGATIVELY impacts passing offenses and favors teams with a strong running game.
-            * **FAVORABLE WEATHER (Dome, or <10 mph wind and no rain/snow):** This heavily favors passing offenses.
-        2.  **BETTING MARKET:**
-            * The Spread and Over/Under are a strong signal of the expected game script and outcome.
-            * You MUST factor this into your analysis (e.g., "The market expects a close, low-scoring game").
-        3.  **LOGIC:** You must explicitly state how the weather and betting markets are influencing your prediction, especially if they contradict (e.g., "The stats favor Team A, but the high winds neutralize their passing attack, which is why I'm picking Team B").
-
-        ## Data for Analysis:
-        ### 1. Betting Market Consensus:
-        {betting_str}
-
-        ### 2. Team Standings ({YEAR}):
-        {team_offense_df[team_offense_df['Team_Full'].isin([home_team_full, away_team_full])].to_string()}
+            ## AI Analysis Directives:
+            You MUST follow these rules when analyzing the data:
+            1.  **WEATHER:**
+                * **HIGH WIND (20+ mph):** This is the most significant factor. High winds severely NEGATIVELY impact passing yards, passing accuracy (especially deep throws), and all kicking. High wind STRONGLY favors the running game and defense.
+                * **RAIN / SNOW:** These conditions make the ball slippery, increasing fumbles and dropped passes. This NEGATIVELY impacts passing offenses and favors teams with a strong running game.
+                * **FAVORABLE WEATHER (Dome, or <10 mph wind and no rain/snow):** This heavily favors passing offenses.
+            2.  **BETTING MARKET:**
+                * The Spread and Over/Under are a strong signal of the expected game script and outcome.
+                * You MUST factor this into your analysis (e.g., "The market expects a close, low-scoring game").
+            3.  **LOGIC:** You must explicitly state how the weather and betting markets are influencing your prediction, especially if they contradict (e.g., "The stats favor Team A, but the high winds neutralize their passing attack, which is why I'm picking Team B").
+
+            ## Data for Analysis:
+            ### 1. Betting Market Consensus:
+            {betting_str}
+
+            ### 2. Team Standings ({YEAR}):
+            {team_offense_df[team_offense_df['Team_Full'].isin([home_team_full, away_team_full])].to_string()}
         
-        ### 3. Weather Forecast:
-        {weather_forecast_str}
-
-        ### 4. Home Team - Healthy Player Stats ({YEAR}):
-        {home_roster_stats.to_string()}
-
-        ### 5. Away Team - Healthy Player Stats ({YEAR}):
-        {away_roster_stats.to_string()}
-        ---
-        Based on your analysis of ONLY the data provided (including the AI Analysis Directives), provide your complete response as a single, valid JSON object with no markdown.
-        Your response must contain keys for "game_prediction", "justification", "top_performers", and "touchdown_scorers".
-        - In "justification", you must explain HOW the betting odds AND weather forecast impacted your prediction.
-        - In "top_performers", identify the 3-4 most impactful offensive players from EACH team.
-        - For every 'confidence' field, you MUST provide an integer between 1 and 100.
-
-        Example JSON schema:
-        {{
-          "game_prediction": {{ "winner": "string", "winner_confidence": 85, "score": "string", "score_confidence": 70 }},
-          "justification": "string",
-          "top_performers": [
-              {{ "player_name": "string", "team": "string", "predicted_stats": {{ "Passing Yards": 250, "Passing Yards_confidence": 65 }} }},
-              {{ "player_name": "string", "team": "string", "predicted_stats": {{ "Rushing Yards": 80, "Rushing Yards_confidence": 70 }} }}
-          ],
-          "touchdown_scorers": [ {{ "player_name": "string", "confidence": 75 }} ]
-        }}
-        """
-        # --- END UPDATED PROMPT ---
+            ### 3. Weather Forecast:
+            {weather_forecast_str}
+
+            ### 4. Home Team - Healthy Player Stats ({YEAR}):
+            {home_roster_stats.to_string()}
+
+            ### 5. Away Team - Healthy Player Stats ({YEAR}):
+            {away_roster_stats.to_string()}
+
+            ### 6. Recent Form (per-game averages over the last {feature_store.SHORT_WINDOW} / last {feature_store.WINDOW} games / season, GP = games played):
+            {recent_form_str}
+            ---
+            Based on your analysis of ONLY the data provided (including the AI Analysis Directives), provide your complete response as a single, valid JSON object with no markdown.
+            Your response must contain keys for "game_prediction", "justification", "top_performers", and "touchdown_scorers".
+            - In "justification", you must explain HOW the betting odds AND weather forecast impacted your prediction.
+            - In "top_performers", identify the 3-4 most impactful offensive players from EACH team.
+            - For every 'confidence' field, you MUST provide an integer between 1 and 100.
+
+            Example JSON schema:
+            {{
+              "game_prediction": {{ "winner": "string", "winner_confidence": 85, "score": "string", "score_confidence": 70 }},
+              "justification": "string",
+              "top_performers": [
+                  {{ "player_name": "string", "team": "string", "predicted_stats": {{ "Passing Yards": 250, "Passing Yards_confidence": 65 }} }},
+                  {{ "player_name": "string", "team": "string", "predicted_stats": {{ "Rushing Yards": 80, "Rushing Yards_confidence": 70 }} }}
+              ],
+              "touchdown_scorers": [ {{ "player_name": "string", "confidence": 75 }} ]
+            }}
+            """
+            # --- END UPDATED PROMPT ---
 
-        try:
-            response = model.generate_content(matchup_prompt, safety_settings=safety_settings)
-            pred_json = json.loads(clean_json_response(response.text))
-
-            game_pred = pred_json.get("game_prediction", {})
-            winner = game_pred.get("winner", "N/A")
-            score = game_pred.get("score", "N/A")
+            try:
+                if model is None:
+                    raise RuntimeError("Vertex AI is not available")
+                response = model.generate_content(matchup_prompt, safety_settings=safety_settings)
+                pred_json = json.loads(clean_json_response(response.text))
+
+                game_pred = pred_json.get("game_prediction", {})
+                winner = game_pred.get("winner", "N/A")
+                score = game_pred.get("score", "N/A")
             
-            justification = pred_json.get("justification", "No justification provided.")
-            top_performers = pred_json.get("top_performers", [])
-            td_scorers = pred_json.get("touchdown_scorers", [])
+                justification = pred_json.get("justification", "No justification provided.")
+                top_performers = pred_json.get("top_performers", [])
+                td_scorers = pred_json.get("touchdown_scorers", [])
 
-            analysis_text = f"**1. Game Prediction:**\n"
-            analysis_text += f"***Predicted Winner:** {winner} (Confidence: {game_pred.get('winner_confidence', 0)}%)\n"
-            analysis_text += f"***Predicted Final Score:** {score} (Confidence: {game_pred.get('score_confidence', 0)}%)\n\n"
+                analysis_text = f"**1. Game Prediction:**\n"
+                analysis_text += f"***Predicted Winner:** {winner} (Confidence: {game_pred.get('winner_confidence', 0)}%)\n"
+                analysis_text += f"***Predicted Final Score:** {score} (Confidence: {game_pred.get('score_confidence', 0)}%)\n\n"
             
-            analysis_text += f"**2. Top Performer Stat Predictions:**\n"
-            if not top_performers:
-                analysis_text += "No key performers identified.\n\n"
-            else:
-                for player in top_performers:
-                    stats = player.get("predicted_stats", {})
-                    p_text = f"***{player.get('player_name', 'N/A')} ({player.get('team', 'N/A')}):**\n"
-                    # --- THIS IS THE CORRECTED BLOCK ---
-                    if 'Passing Yards' in stats: p_text += f"** Passing Yards:** {stats.get('Passing Yards', 'N/A')} (Confidence: {stats.get('Passing Yards_confidence', 0)}%)\n"
-                    if 'Rushing Yards' in stats: p_text += f"** Rushing Yards:** {stats.get('Rushing Yards', 'N/A')} (Confidence: {stats.get('Rushing Yards_confidence', 0)}%)\n"
-                    if 'Receiving Yards' in stats: p_text += f"** Receiving Yards:** {stats.get('Receiving Yards', 'N/A')} (Confidence: {stats.get('Receiving Yards_confidence', 0)}%)\n"
-                    if 'Passing TDs' in stats: p_text += f"** Passing TDs:** {stats.get('Passing TDs', 'N/A')} (Confidence: {stats.get('Passing TDs_confidence', 0)}%)\n"
-                    if 'Rushing TDs' in stats: p_text += f"** Rushing TDs:** {stats.get('Rushing TDs', 'N/A')} (Confidence: {stats.get('Rushing TDs_confidence', 0)}%)\n"
-                    if 'Receiving TDs' in stats: p_text += f"** Receiving TDs:** {stats.get('Receiving TDs', 'N/A')} (Confidence: {stats.get('Receiving TDs_confidence', 0)}%)\n"
-                    if 'Interceptions' in stats: p_text += f"** Interceptions:** {stats.get('Interceptions', 'N/A')} (Confidence: {stats.get('Interceptions_confidence', 0)}%)\n"
-                    # --- END CORRECTED BLOCK ---
-                    analysis_text += p_text + "\n"
-
-            analysis_text += f"**3. Touchdown Scorers:**\n"
-            for scorer in td_scorers:
-                player_name = scorer.get("player_name", "N/A")
-                confidence = scorer.get("confidence", 0)
-                analysis_text += f"** {player_name} (Confidence: {confidence}%)\n"
-            analysis_text += "\n"
-
-            analysis_text += f"**4. Justification:**\n{justification}"
-
-            worksheet.update(f'D{row_num}:F{row_num}', [[winner, score, analysis_text.strip()]])
-            print(f"    -> SUCCESS: Wrote formatted prediction for {away_team_full} vs {home_team_full}")
+                analysis_text += f"**2. Top Performer Stat Predictions:**\n"
+                if not top_performers:
+                    analysis_text += "No key performers identified.\n\n"
+                else:
+                    for player in top_performers:
+                        stats = player.get("predicted_stats", {})
+                        p_text = f"***{player.get('player_name', 'N/A')} ({player.get('team', 'N/A')}):**\n"
+                        # --- THIS IS THE CORRECTED BLOCK ---
+                        if 'Passing Yards' in stats: p_text += f"** Passing Yards:** {stats.get('Passing Yards', 'N/A')} (Confidence: {stats.get('Passing Yards_confidence', 0)}%)\n"
+                        if 'Rushing Yards' in stats: p_text += f"** Rushing Yards:** {stats.get('Rushing Yards', 'N/A')} (Confidence: {stats.get('Rushing Yards_confidence', 0)}%)\n"
+                        if 'Receiving Yards' in stats: p_text += f"** Receiving Yards:** {stats.get('Receiving Yards', 'N/A')} (Confidence: {stats.get('Receiving Yards_confidence', 0)}%)\n"
+                        if 'Passing TDs' in stats: p_text += f"** Passing TDs:** {stats.get('Passing TDs', 'N/A')} (Confidence: {stats.get('Passing TDs_confidence', 0)}%)\n"
+                        if 'Rushing TDs' in stats: p_text += f"** Rushing TDs:** {stats.get('Rushing TDs', 'N/A')} (Confidence: {stats.get('Rushing TDs_confidence', 0)}%)\n"
+                        if 'Receiving TDs' in stats: p_text += f"** Receiving TDs:** {stats.get('Receiving TDs', 'N/A')} (Confidence: {stats.get('Receiving TDs_confidence', 0)}%)\n"
+                        if 'Interceptions' in stats: p_text += f"** Interceptions:** {stats.get('Interceptions', 'N/A')} (Confidence: {stats.get('Interceptions_confidence', 0)}%)\n"
+                        # --- END CORRECTED BLOCK ---
+                        analysis_text += p_text + "\n"
+
+                analysis_text += f"**3. Touchdown Scorers:**\n"
+                for scorer in td_scorers:
+                    player_name = scorer.get("player_name", "N/A")
+                    confidence = scorer.get("confidence", 0)
+                    analysis_text += f"** {player_name} (Confidence: {confidence}%)\n"
+                analysis_text += "\n"
+
+                analysis_text += f"**4. Justification:**\n{justification}"
+
+                rows.append([away_team_full, home_team_full, kickoff_display_str, winner, score, analysis_text.strip(), baseline_winner, baseline_score])
+                print(f"    -> SUCCESS: Generated prediction for {away_team_full} vs {home_team_full}")
+            except Exception as e:
+                print(f"    -> ERROR: Could not generate or parse prediction: {e}")
+                if 'response' in locals() and hasattr(response, 'candidates') and response.candidates:
+                    print(f"    -> AI Response Finish Reason: {response.candidates[0].finish_reason}")
+                    print(f"    -> AI Response Safety Ratings: {response.candidates[0].safety_ratings}")
+                fallback_text = f"**LLM prediction unavailable** ({e}).\nStatistical baseline: {baseline_winner} {baseline_score}"
+                home_win_prob = baseline['Baseline_Home_Win_Prob']
+                fallback_text += f" (home win probability {home_win_prob:.0%})." if pd.notna(home_win_prob) else "."
+                rows.append([away_team_full, home_team_full, kickoff_display_str, baseline_winner, baseline_score, fallback_text, baseline_winner, baseline_score])
+                print(f"    -> FALLBACK: Using baseline prediction for {away_team_full} vs {home_team_full}")
         except Exception as e:
-            print(f"    -> ERROR: Could not generate or parse prediction: {e}")
-            if 'response' in locals() and hasattr(response, 'candidates') and response.candidates:
-                print(f"    -> AI Response Finish Reason: {response.candidates[0].finish_reason}")
-                print(f"    -> AI Response Safety Ratings: {response.candidates[0].safety_ratings}")
-        time.sleep(5)
-
-def main():
-    if not FOOTBALL_API_KEY:
-        print("❌ CRITICAL ERROR: AMERICAN_FOOTBALL_API_KEY secret not found.")
-        return
-    
-    print("Authenticating with Google Sheets...")
-    gc = get_gspread_client()
-    spreadsheet = gc.open_by_key(SPREADSHEET_KEY)
-    
+            # Anything failing outside the LLM call (a missing tab, a bad row) still gets a row, so the
+            # predictions already made for the rest of the slate are kept
+            away_team_full, home_team_full = game.get('Away Team', 'N/A'), game.get('Home Team', 'N/A')
+            print(f"    -> ERROR: Could not build prediction for {away_team_full} vs {home_team_full}: {e}")
+            try:
+                kickoff_display_str = game['datetime'].astimezone(eastern_tz).strftime('%Y-%m-%d %I:%M %p %Z')
+            except Exception:
+                kickoff_display_str = 'N/A'
+            baseline_winner, baseline_score = 'N/A', 'N/A'
+            if index in baseline_df.index:
+                baseline_winner, baseline_score = baseline_df.loc[index, ['Baseline_Winner', 'Baseline_Score']]
+            fallback_text = f"**Prediction unavailable** ({e}).\nStatistical baseline: {baseline_winner} {baseline_score}."
+            rows.append([away_team_full, home_team_full, kickoff_display_str, baseline_winner, baseline_score, fallback_text, baseline_winner, baseline_score])
+        if model is not None:
+            time.sleep(5)
+    return rows
+
+def load_sheet_dataframes(spreadsheet):
     dataframes = {}
     print("\nLoading all data from Google Sheet tabs...")
     sheet_titles = [s.title for s in spreadsheet.worksheets()]
@@ -400,11 +538,40 @@ def main():
                 if 'Player' in df.columns:
                     df['Player_Normalized'] = df['Player'].apply(normalize_player_name)
                 dataframes[title] = df
+    return dataframes
+
+def parse_schedule(schedule_df):
+    """Adds a UTC 'datetime' column and makes Week/GameID numeric, dropping rows that don't parse."""
+    schedule_df = schedule_df[schedule_df['Date'] != 'Date'].copy()
+    datetime_str = schedule_df['Date'] + " " + schedule_df['Time']
+    schedule_df['datetime'] = pd.to_datetime(datetime_str, format='%Y-%m-%d %H:%M', errors='coerce').dt.tz_localize('UTC')
+    schedule_df.dropna(subset=['datetime'], inplace=True)
+    schedule_df['Week'] = pd.to_numeric(schedule_df['Week'], errors='coerce')
+    schedule_df['GameID'] = pd.to_numeric(schedule_df['GameID'], errors='coerce') # Ensure GameID is numeric
+    schedule_df.dropna(subset=['Week', 'GameID'], inplace=True)
+    schedule_df['Week'] = schedule_df['Week'].astype(int)
+    return schedule_df
 
+def get_schedule_week(spreadsheet, now_utc):
+    """
+    Fast path: reads only the Schedule tab to find the upcoming week.
+    Returns None if the Schedule tab can't be read, so the caller falls back to the full load.
+    """
+    try:
+        data = spreadsheet.worksheet("Schedule").get_all_values()
+    except gspread.WorksheetNotFound:
+        return None
+    if not data or len(data) < 2 or not {'Date', 'Time', 'Week', 'GameID'} <= set(data[0]):
+        return None
+    schedule_df = parse_schedule(pd.DataFrame(data[1:], columns=data[0]))
+    return get_current_week(schedule_df, now_utc)
+
+def prepare_dataframes(dataframes):
+    """Unifies team names, builds player_stats_current and the odds-merged Schedule. Returns None on failure."""
     print("\n--- Unifying Team Names Across All Data Sources ---")
     if 'team_match' not in dataframes:
         print("❌ CRITICAL ERROR: 'team_match' tab not found. Cannot unify team names.")
-        return
+        return None
         
     team_map_df = dataframes['team_match']
     master_team_map = {row[col]: row['Full Name'] for _, row in team_map_df.iterrows() for col in team_map_df.columns if pd.notna(row[col]) and row[col]}
@@ -418,6 +585,8 @@ def main():
                 else:
                     df[col] = df[col].map(master_team_map).fillna(df[col])
         dataframes[name] = df
+    # Kept for sources outside the sheet (the feature store) that need the same names
+    dataframes['team_name_map'] = master_team_map
     
     player_stat_dfs = []
     for sheet_name in ['O_Player_Passing', 'O_Player_Rushing', 'O_Player_Receiving']:
@@ -426,29 +595,22 @@ def main():
     
     if not player_stat_dfs:
         print("❌ CRITICAL ERROR: No player stats tabs (O_Player_Passing, etc.) found.")
-        return
+        return None
         
     dataframes['player_stats_current'] = pd.concat(player_stat_dfs, ignore_index=True)
 
     # --- Load Schedule ---
     if 'Schedule' not in dataframes:
         print("❌ CRITICAL ERROR: 'Schedule' tab not found. Cannot determine games to predict.")
-        return
+        return None
     schedule_df = dataframes['Schedule']
     
     if 'Venue_Country' not in schedule_df.columns:
         print("❌ CRITICAL ERROR: 'Schedule' tab is missing 'Venue_Country'.")
         print("  -> Please re-run the 'pfr_scraper.py' script to update the sheet.")
-        return
+        return None
     
-    schedule_df = schedule_df[schedule_df['Date'] != 'Date'].copy()
-    datetime_str = schedule_df['Date'] + " " + schedule_df['Time']
-    schedule_df['datetime'] = pd.to_datetime(datetime_str, format='%Y-%m-%d %H:%M', errors='coerce').dt.tz_localize('UTC')
-    schedule_df.dropna(subset=['datetime'], inplace=True)
-    schedule_df['Week'] = pd.to_numeric(schedule_df['Week'], errors='coerce')
-    schedule_df['GameID'] = pd.to_numeric(schedule_df['GameID'], errors='coerce') # Ensure GameID is numeric
-    schedule_df.dropna(subset=['Week', 'GameID'], inplace=True)
-    schedule_df['Week'] = schedule_df['Week'].astype(int)
+    schedule_df = parse_schedule(schedule_df)
 
     # --- NEW: Load and Merge Betting Odds ---
     if 'Betting_Odds' in dataframes:
@@ -468,28 +630,71 @@ def main():
         schedule_df['Over_Under'] = 'N/A'
         
     dataframes['Schedule'] = schedule_df # Save the merged dataframe
+    return dataframes
 
-    # --- NEW: Calculate Current Week in main() ---
-    now_utc = datetime.now(timezone.utc)
-    current_week = 0
+def load_feature_store(team_name_map, store=None):
+    """
+    Brings the local feature store up to date with newly completed games, mapping API team
+    names through team_name_map (see prepare_dataframes). Returns None on failure.
+    """
+    try:
+        return feature_store.update_store(
+            YEAR, get_api_data, key_fn=normalize_player_name,
+            team_key_fn=lambda name: team_name_map.get(name, name), store=store,
+        )
+    except Exception as e:
+        print(f"  -> WARNING: Could not update the feature store, predicting without recent form: {e}")
+        return None
+
+def get_current_week(schedule_df, now_utc):
     if MANUAL_WEEK_OVERRIDE:
-        current_week = MANUAL_WEEK_OVERRIDE
-    else:
-        future_games = schedule_df[schedule_df['datetime'] > now_utc]
-        if not future_games.empty:
-            current_week = int(future_games['Week'].min())
+        return MANUAL_WEEK_OVERRIDE
+    future_games = schedule_df[schedule_df['datetime'] > now_utc]
+    if future_games.empty:
+        return 0
+    return int(future_games['Week'].min())
+
+def main():
+    if not FOOTBALL_API_KEY:
+        print("❌ CRITICAL ERROR: AMERICAN_FOOTBALL_API_KEY secret not found.")
+        return
+    
+    print("Authenticating with Google Sheets...")
+    gc = get_gspread_client()
+    # Data is read from the source spreadsheet only; results go to every publish target
+    spreadsheet = gc.open_by_key(SPREADSHEET_KEY)
+    opened_targets = publisher.open_targets(gc, load_publish_targets())
+    now_utc = datetime.now(timezone.utc)
+
+    # Check the Schedule tab alone first so off-season / no-op runs skip loading everything else
+    if get_schedule_week(spreadsheet, now_utc) == 0:
+        print("  -> No future games found to predict.")
+        publisher.fan_out(opened_targets, lambda target_spreadsheet, target: hide_data_sheets(target_spreadsheet, 0)) # 0 signals no active week
+        print("\n✅ Prediction/Results script finished (no games to predict).")
+        return
+    
+    dataframes = prepare_dataframes(load_sheet_dataframes(spreadsheet))
+    if dataframes is None:
+        return
+
+    # --- NEW: Calculate Current Week in main() ---
+    current_week = get_current_week(dataframes['Schedule'], now_utc)
 
     if not current_week:
         print("  -> No future games found to predict.")
-        hide_data_sheets(spreadsheet, 0) # 0 signals no active week
+        publisher.fan_out(opened_targets, lambda target_spreadsheet, target: hide_data_sheets(target_spreadsheet, 0)) # 0 signals no active week
         print("\n✅ Prediction/Results script finished (no games to predict).")
         return
 
+    dataframes['feature_store'] = load_feature_store(dataframes['team_name_map'])
+
     print(f"\n--- Running PREDICTION mode for upcoming week: {current_week} ---")
-    run_prediction_mode(spreadsheet, dataframes, now_utc, current_week)
+    rows = run_prediction_mode(dataframes, now_utc, current_week)
 
-    # --- NEW: Call hide_data_sheets with the current week ---
-    hide_data_sheets(spreadsheet, current_week)
+    print(f"\n--- Publishing Week {current_week} predictions to {len(opened_targets)} spreadsheet(s) ---")
+    failed = publish_predictions(opened_targets, current_week, rows)
+    if failed:
+        print(f"  -> Publishing failed for: {', '.join(failed)}")
     print("\n✅ Prediction/Results script finished.")
 
 if __name__ == "__main__":